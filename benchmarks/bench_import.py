@@ -0,0 +1,51 @@
+"""Measure the time to import pyweakref in a fresh interpreter.
+
+Run from the repository root:
+
+    python benchmarks/bench_import.py [runs]
+
+Each run starts a new interpreter, so the figure includes no module
+cached by an earlier run. The interpreter startup alone is measured
+too, and subtracted. Also reports whether the import started threads
+or imported NumPy."""
+
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIMED = """
+import time
+started = time.perf_counter()
+{}
+print(time.perf_counter() - started)
+"""
+
+CHECKS = """
+import sys, threading
+import pyweakref
+print(threading.active_count(), "numpy" in sys.modules)
+"""
+
+def run(code):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+def measure(statement, runs):
+    return [float(run(TIMED.format(statement))[0]) for _ in range(runs)]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    baseline = statistics.median(measure("pass", runs))
+    timings = measure("import pyweakref", runs)
+    threads, numpy = run(CHECKS)
+    print(f"import pyweakref: median {(statistics.median(timings) - baseline) * 1000:.2f} ms, "
+          f"best {(min(timings) - baseline) * 1000:.2f} ms over {runs} runs")
+    print(f"threads after import: {threads}, numpy imported: {numpy}")
+
+if __name__ == "__main__":
+    main()
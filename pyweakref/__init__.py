@@ -15,24 +15,33 @@ from .support import (
      get_pyweakref_count,
      get_pyweakrefs as get_pyweakrefs,
      ref,
+     ref_many,
      proxy,
      AbstractProxyType,
      CallableProxyType,
      ProxyType,
      ReferenceType,
+     _probe,
+     _ref_many,
      _remove_dead_pyweakref,
-     register)
+     register,
+     subscribe,
+     unsubscribe)
 
 from ._pyweakrefset import WeakSet, _IterationGuard
 
 import _collections_abc  # Import after _weakref to avoid circular import.
 import sys
 import itertools
+import collections
+import functools
+import time
 
-__all__ = ["ref", "proxy", "get_pyweakref_count", "get_pyweakrefs",
+__all__ = ["ref", "ref_many", "proxy", "get_pyweakref_count", "get_pyweakrefs",
            "WeakKeyDictionary", "ReferenceType", "ProxyType",
            "CallableProxyType", "AbstractProxyType", "WeakValueDictionary",
-           "WeakSet", "WeakMethod", "finalize", "register"]
+           "WeakSet", "WeakMethod", "finalize", "register", "WeakCache",
+           "weak_memoize"]
 
 
 _collections_abc.Set.register(WeakSet)
@@ -291,13 +300,17 @@ class WeakValueDictionary(_collections_abc.MutableMapping):
         if self._pending_removals:
             self._commit_removals()
         d = self.data
+        # Not from _lib\weakref.py: create the references in bulk
+        items = []
         if other is not None:
             if not hasattr(other, "items"):
                 other = dict(other)
-            for key, o in other.items():
-                d[key] = KeyedRef(o, self._remove, key)
-        for key, o in kwargs.items():
-            d[key] = KeyedRef(o, self._remove, key)
+            items.extend(other.items())
+        items.extend(kwargs.items())
+        wrs = _ref_many(KeyedRef, [o for key, o in items], self._remove)
+        for (key, o), wr in zip(items, wrs):
+            wr.key = key
+            d[key] = wr
 
     def valuerefs(self):
         """Return a list of weak references to the values.
@@ -354,6 +367,143 @@ class KeyedRef(ref):
         super().__init__(ob, callback)
 
 
+# Not from _lib\weakref.py
+
+_CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "ttl", "retained"])
+
+class WeakCache(WeakValueDictionary):
+    """Mapping class that references values weakly, except for the
+    recently used ones.
+
+    Up to maxsize values set or looked up within the last ttl seconds
+    are also referenced strongly, so they survive purges. The others
+    are held weakly, as in a WeakValueDictionary. A maxsize or ttl of
+    None means no bound of that kind.
+
+    Values expire on updates and lookups, and after each purge cycle,
+    so an idle cache does not keep them alive.
+
+    cache_info() reports the hits and misses of lookups, and the
+    evictions of values from the strongly referenced ones.
+    """
+
+    def __init__(self, other=(), /, maxsize=128, ttl=None, **kw):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError("maxsize must be None or non-negative")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be None or positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+        # key -> (value, expiry time), least recently used first
+        self._strong = collections.OrderedDict()
+        super().__init__(other, **kw)
+        if ttl is not None:
+            def expire(cycle, selfref=ref(self)):
+                self = selfref()
+                if self is None:
+                    unsubscribe(expire)
+                else:
+                    self.expire()
+            subscribe(expire)
+
+    def _retain(self, key, value):
+        strong = self._strong
+        expiry = None if self.ttl is None else time.monotonic() + self.ttl
+        strong[key] = value, expiry
+        strong.move_to_end(key)
+        self.expire()
+        if self.maxsize is not None:
+            while len(strong) > self.maxsize:
+                strong.popitem(last=False)
+                self.evictions += 1
+
+    def _release(self, key):
+        self._strong.pop(key, None)
+
+    def expire(self):
+        """Stop referencing strongly the values unused for ttl seconds.
+        This happens on each update or lookup, and after each purge
+        cycle, anyway."""
+        if self.ttl is None:
+            return
+        strong = self._strong
+        now = time.monotonic()
+        # The least recently used values expire first. Purge cycles
+        # expire them from the purger thread, so expect others to
+        # change the cache meanwhile.
+        while True:
+            item = next(iter(strong.items()), None)
+            if item is None:
+                break
+            key, (value, expiry) = item
+            if expiry > now:
+                break
+            if strong.pop(key, None) is not None:
+                self.evictions += 1
+
+    def cache_info(self):
+        """Return the hits, misses and evictions so far, the bounds,
+        and the number of values referenced strongly."""
+        self.expire()
+        return _CacheInfo(self.hits, self.misses, self.evictions,
+                          self.maxsize, self.ttl, len(self._strong))
+
+    def __getitem__(self, key):
+        try:
+            o = super().__getitem__(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        self._retain(key, o)
+        return o
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._release(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._retain(key, value)
+
+    def clear(self):
+        self._strong.clear()
+        super().clear()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def popitem(self):
+        key, o = super().popitem()
+        self._release(key)
+        return key, o
+
+    def pop(self, key, *args):
+        # Release the value once popped: the purger could purge it before.
+        o = super().pop(key, *args)
+        self._release(key)
+        return o
+
+    def setdefault(self, key, default=None):
+        o = super().setdefault(key, default)
+        self._retain(key, o)
+        return o
+
+    def update(self, other=None, /, **kwargs):
+        items = {}
+        if other is not None:
+            items.update(other)
+        items.update(kwargs)
+        super().update(items)
+        for key, o in items.items():
+            self._retain(key, o)
+
+
 class WeakKeyDictionary(_collections_abc.MutableMapping):
     """ Mapping class that references keys weakly.
 
@@ -364,6 +514,8 @@ class WeakKeyDictionary(_collections_abc.MutableMapping):
     can be especially useful with objects that override attribute
     accesses.
     """
+    # Not from _lib\weakref.py: lookups use _probe(key) rather than
+    # ref(key), so they don't register pyweakrefs.
 
     def __init__(self, dict=None):
         self.data = {}
@@ -402,10 +554,10 @@ class WeakKeyDictionary(_collections_abc.MutableMapping):
 
     def __delitem__(self, key):
         self._dirty_len = True
-        del self.data[ref(key)]
+        del self.data[_probe(key)]
 
     def __getitem__(self, key):
-        return self.data[ref(key)]
+        return self.data[_probe(key)]
 
     def __len__(self):
         if self._dirty_len and self._pending_removals:
@@ -418,7 +570,12 @@ class WeakKeyDictionary(_collections_abc.MutableMapping):
         return "<%s at %#x>" % (self.__class__.__name__, id(self))
 
     def __setitem__(self, key, value):
-        self.data[ref(key, self._remove)] = value
+        # Not from _lib\weakref.py: an existing key keeps its pyweakref
+        probe = _probe(key)
+        if probe in self.data:
+            self.data[probe] = value
+        else:
+            self.data[ref(key, self._remove)] = value
 
     def copy(self):
         new = WeakKeyDictionary()
@@ -442,11 +599,11 @@ class WeakKeyDictionary(_collections_abc.MutableMapping):
         return new
 
     def get(self, key, default=None):
-        return self.data.get(ref(key),default)
+        return self.data.get(_probe(key),default)
 
     def __contains__(self, key):
         try:
-            wr = ref(key)
+            wr = _probe(key)
         except TypeError:
             return False
         return wr in self.data
@@ -495,18 +652,31 @@ class WeakKeyDictionary(_collections_abc.MutableMapping):
 
     def pop(self, key, *args):
         self._dirty_len = True
-        return self.data.pop(ref(key), *args)
+        return self.data.pop(_probe(key), *args)
 
     def setdefault(self, key, default=None):
-        return self.data.setdefault(ref(key, self._remove),default)
+        # Not from _lib\weakref.py: an existing key keeps its pyweakref
+        try:
+            return self.data[_probe(key)]
+        except KeyError:
+            return self.data.setdefault(ref(key, self._remove),default)
 
     def update(self, dict=None, /, **kwargs):
         d = self.data
         if dict is not None:
             if not hasattr(dict, "items"):
                 dict = type({})(dict)
+            # Not from _lib\weakref.py: create the references of the
+            # new keys in bulk
+            items = []
             for key, value in dict.items():
-                d[ref(key, self._remove)] = value
+                probe = _probe(key)
+                if probe in d:
+                    d[probe] = value
+                else:
+                    items.append((key, value))
+            wrs = _ref_many(ref, [key for key, value in items], self._remove)
+            d.update(zip(wrs, [value for key, value in items]))
         if len(kwargs):
             self.update(kwargs)
 
@@ -664,4 +834,75 @@ class finalize:
             # prevent any more finalizers from executing during shutdown
             finalize._shutdown = True
             if reenable_gc:
-                gc.enable()
\ No newline at end of file
+                gc.enable()
+
+
+# Not from _lib\weakref.py
+
+_MemoizeInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+def weak_memoize(maxsize=None):
+    """Decorator to memoize a function by its first argument, held
+    weakly, and its other arguments, which must be hashable.
+
+    Each object gets its own cache of up to maxsize results, the least
+    recently used dropped first, or unbounded if maxsize is None. The
+    cache is dropped when the object is purged, unless a result refers
+    to the object, which then keeps it alive.
+
+    The wrapper has cache_info(), which returns the hits, misses,
+    maxsize and number of cached results, and cache_clear().
+    """
+    if callable(maxsize):
+        # Used as @weak_memoize, without arguments
+        return weak_memoize()(maxsize)
+    if maxsize is not None and maxsize < 0:
+        raise ValueError("maxsize must be None or non-negative")
+
+    def decorator(func):
+        # object -> {arguments: result}
+        caches = WeakKeyDictionary()
+        counts = [0, 0]  # hits, misses
+        kwd_mark = object()
+
+        @functools.wraps(func)
+        def wrapper(obj, /, *args, **kwargs):
+            key = args
+            if kwargs:
+                key += (kwd_mark,) + tuple(kwargs.items())
+            cache = caches.get(obj)
+            if cache is not None:
+                try:
+                    result = cache[key]
+                except KeyError:
+                    pass
+                else:
+                    counts[0] += 1
+                    if maxsize is not None:
+                        cache.move_to_end(key)
+                    return result
+            counts[1] += 1
+            result = func(obj, *args, **kwargs)
+            # Recursive calls may have created the cache meanwhile.
+            cache = caches.get(obj)
+            if cache is None:
+                cache = caches[obj] = {} if maxsize is None else collections.OrderedDict()
+            cache[key] = result
+            if maxsize is not None and len(cache) > maxsize:
+                cache.popitem(last=False)
+            return result
+
+        def cache_info():
+            currsize = sum(len(cache) for cache in list(caches.values()))
+            return _MemoizeInfo(counts[0], counts[1], maxsize, currsize)
+
+        def cache_clear():
+            caches.clear()
+            counts[:] = [0, 0]
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
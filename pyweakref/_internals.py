@@ -1,17 +1,16 @@
 # Internals. Do not import directly.
 
 import _collections_abc
+import array
+import collections
 import gc
+import itertools
 import sys
 import threading
+import time
 import types
 import typing
-
-try:
-    import numpy.core.numerictypes as nptypes
-    import numpy.core._multiarray_umath as np
-except ImportError:
-    np = nptypes = None
+import weakref
     
 __all__ = [
     # Classes
@@ -20,15 +19,35 @@ __all__ = [
     "ProxyType", 
     "ReferenceDescriptor", 
     "ReferenceType",
+    "ReferenceView",
     
     # Functions
+    "async_purger",
     "circular_reference_count",
+    "compact",
     "disable_purging",
     "enable_purging",
+    "get_analyzer",
+    "get_callback_dispatcher",
+    "get_generation_intervals",
+    "get_purge_interval",
+    "get_purge_trigger",
     "get_pyweakref_count",
     "get_pyweakrefs",
+    "memory_report",
     "purge",
     "purging",
+    "ref_many",
+    "register_counter",
+    "set_analyzer",
+    "set_callback_dispatcher",
+    "set_generation_intervals",
+    "set_purge_budget",
+    "set_purge_interval",
+    "set_purge_trigger",
+    "stats",
+    "subscribe",
+    "unsubscribe",
     
     # Aliases
     "ref"
@@ -36,9 +55,6 @@ __all__ = [
 
 ### Internal objects###
 
-def _callback(ref):
-    return _reference_registry[id(ref)][1]
-
 # Marker for _get_circular_ref_count
 _circular_ref_marker = object()
 
@@ -67,15 +83,252 @@ def _descriptors(obj):
                 get_descriptor_dict[name] = value
     return get_descriptor_dict
 
-def _get_circular_ref_count(obj, data=_circular_ref_marker, memo=None, parent=None):
-    
-    ## Pre-examination checks, base cases ##
+def _descriptor_referents(data):
+    # Yield the attributes of data exposed by its get descriptors,
+    # then its items (keys and values for mappings).
+    cls = type(data)
+    for get_descriptor in _descriptors(data).values():
+        try:
+            yield get_descriptor.__get__(data, cls)
+        except AttributeError:
+            pass
+    if isinstance(data, _collections_abc.Mapping):
+        for key, value in data.items():
+            yield key
+            yield value
+    elif isinstance(data, _collections_abc.Iterable):
+        iterator = iter(data)
+        try:
+            while True:
+                yield next(iterator)
+        except Exception:
+            pass
+
+def _instance_state(data):
+    # Return the values held in the __slots__ and __dict__ of data.
+    cls = type(data)
+    members = _slot_members.get(cls)
+    if members is None:
+        members = _slot_members[cls] = tuple(
+            (index, name) for index, klass in enumerate(cls.__mro__)
+            if "__slots__" in klass.__dict__
+            for name, value in klass.__dict__.items()
+            if isinstance(value, types.MemberDescriptorType))
+    state = []
+    mro = cls.__mro__
+    for index, name in members:
+        try:
+            state.append(mro[index].__dict__[name].__get__(data, cls))
+        except AttributeError:
+            pass
+    if cls.__dictoffset__:
+        dct = getattr(data, "__dict__", None)
+        if type(dct) is dict:
+            state.extend(dct.values())
+    return state
+
+def _dict_referents(data):
+    # Keys and values, bypassing overridden __iter__ and values()
+    if type(data) is dict:
+        return itertools.chain(dict.keys(data), dict.values(data))
+    return itertools.chain(dict.keys(data), dict.values(data), _instance_state(data))
+
+def _list_referents(data):
+    if type(data) is list:
+        return data
+    return itertools.chain(list.__iter__(data), _instance_state(data))
+
+def _tuple_referents(data):
+    # Namedtuples have empty __slots__, so they take the fast path too.
+    if type(data) is tuple:
+        return data
+    return itertools.chain(tuple.__iter__(data), _instance_state(data))
+
+def _ndarray_referents(arr):
+    # A view shares the storage of its base. Refer to the base
+    # instead, so the storage is scanned once however many views
+    # there are.
+    if arr.base is not None:
+        return (arr.base,)
+    # Only object arrays, or structured arrays with object fields,
+    # can refer to anything. Don't look at the items of others.
+    if not arr.dtype.hasobject:
+        return ()
+    return _object_array_items(arr)
+
+def _object_array_items(arr):
+    # Yield the objects stored in arr, copying at most
+    # _numpy_chunk_size of them at a time.
+    names = arr.dtype.names
+    if names:
+        for name in names:
+            if arr.dtype.fields[name][0].hasobject:
+                yield from _object_array_items(arr[name])
+        return
+    flat = arr.flat
+    for start in range(0, arr.size, _numpy_chunk_size):
+        yield from flat[start:start + _numpy_chunk_size].tolist()
+
+def _numpy_scalar_referents(obj):
+    if not obj.dtype.hasobject:
+        return ()
+    return NotImplemented
+
+# Number of items of an object array copied at a time
+_numpy_chunk_size = 4096
+
+def _is_slotted(cls):
+    # Return True if every class in the MRO of cls, but object,
+    # declares __slots__ and none of them adds a __dict__.
+    return not cls.__dictoffset__ and \
+        all("__slots__" in klass.__dict__ for klass in cls.__mro__[:-1])
+
+def _counter_for(cls):
+    # Return the handler which finds the objects instances of cls refer
+    # to, or None to use the analyzer. Results are cached per type.
+    try:
+        return _counter_cache[cls]
+    except KeyError:
+        pass
+    if not _numpy_loaded and any(getattr(klass, "__module__", "").partition(".")[0] == "numpy"
+                                 for klass in cls.__mro__):
+        _load_numpy()
+    for klass in cls.__mro__:
+        if klass in _counters:
+            counter = _counters[klass]
+            break
+    else:
+        if getattr(cls, "__dataclass_fields__", None) is not None or _is_slotted(cls):
+            counter = _instance_state
+        else:
+            counter = None
+    _counter_cache[cls] = counter
+    return counter
+
+# The per-type caches below hold their types weakly, so they don't keep
+# dynamic classes alive.
+
+# (index in the MRO, name) of the member descriptors of the __slots__
+# of each type, for _instance_state. The descriptors themselves would
+# hold the types.
+_slot_members = weakref.WeakKeyDictionary()
+
+# Handlers which find the objects instances of a type refer to, by type.
+# They take precedence over the analyzer. Dataclasses and classes with
+# __slots__ only are handled by _instance_state.
+_counters = {
+    dict: _dict_referents,
+    list: _list_referents,
+    tuple: _tuple_referents,
+}
+
+# type -> handler or None, filled by _counter_for
+_counter_cache = weakref.WeakKeyDictionary()
+
+# Whether the NumPy handlers have been registered. NumPy is not
+# imported by pyweakref: its handlers are registered once an instance
+# of a NumPy type is met, by which time NumPy has been imported.
+_numpy_loaded = False
+
+def _load_numpy():
+    global _numpy_loaded
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        _counters[numpy.ndarray] = _ndarray_referents
+        _counters[numpy.generic] = _numpy_scalar_referents
+        _numpy_loaded = True
+
+# Strategies which find the objects a node of the traversal refers to.
+# "descriptor" runs the node's get descriptors and iterates it, "gc"
+# asks the garbage collector, which runs no Python code and so has no
+# side effects. It only sees objects the garbage collector tracks.
+_analyzers = {
+    "descriptor": _descriptor_referents,
+    "gc": gc.get_referents,
+}
+
+# Name of the strategy in use
+_analyzer = "descriptor"
+
+# Number of objects visited by _count_circular_refs, for the statistics
+_nodes_traversed = 0
+
+# Scratch buffers for _count_circular_refs, reused across calls.
+# A call which finds them in use (by another thread, or a get
+# descriptor calling back into the purger) allocates its own.
+_traversal_stack = []
+_traversal_visited = {}
+_traversal_counts = {}
+_traversal_children = {}
+_traversal_lock = threading.Lock()
+
+def _count_circular_refs(obj, data, stack, visited, counts, children):
+
+    # The counter of self-references
+    counter = 0
+
+    # The referent analyzer
+    referents = _analyzers[_analyzer]
+
+    # The number of objects visited
+    nodes = 0
+
+    # Visited objects, by id. They are kept alive until the end of the
+    # traversal, so that their ids can't be reused by temporaries
+    # (e.g. property results).
+    visited[id(data)] = data
+    stack.append(data)
+
+    while stack:
+        data = stack.pop()
+        nodes += 1
+
+        ## Collect the objects data refers to, and how often ##
+        handler = _counter_for(type(data))
+        found = NotImplemented if handler is None else handler(data)
+        if found is NotImplemented:
+            found = referents(data)
+        for value in found:
+            id_ = id(value)
+            if id_ in counts:
+                counts[id_] += 1
+            else:
+                counts[id_] = 1
+                children[id_] = value
+        value = data = found = None
+
+        ## Investigate objects solely dependent on the data ##
+        for id_, count in counts.items():
+            value = children[id_]
+            # Add count if value is obj. Value must have
+            # come from obj, because we are searching
+            # obj and its dependents
+            if value is obj:
+                counter += count
+            # Visit value later if it is totally dependent on data,
+            # unless it is known to hold no references or was visited.
+            elif id_ not in visited and type(value) not in _circular_ref_whitelist:
+                # Subtract children, value, param
+                if sys.getrefcount(value) - 3 <= count:
+                    visited[id_] = value
+                    stack.append(value)
+        value = None
+        counts.clear()
+        children.clear()
+
+    global _nodes_traversed
+    _nodes_traversed += nodes
+
+    # We're done! Return the counter.
+    return counter
+
+def _get_circular_ref_count(obj, data=_circular_ref_marker):
+
     # When invoked with only 1 argument (in _get_threshold),
     # a marker prevents an automatic return of 1. Now the
     # marker's purpose if fulfilled, set data to obj.
     if data is _circular_ref_marker:
         data = obj
-    
 
     # Some instances are built-in types are known not 
     # to contain any references of obj. If so, save
@@ -83,85 +336,41 @@ def _get_circular_ref_count(obj, data=_circular_ref_marker, memo=None, parent=No
     if type(data) in _circular_ref_whitelist:
         return 0
 
-    # Memo is set to None when invoked with 1 argument.
-    # If so, set memo to an empty list (which can't be
-    # corrupted).
-    if memo is None:
-        memo = []
-
-    # Sometimes, we have already examined an object. All
-    # of its references to obj have been exposed. Return 0,
-    # there are no more left to expose.
-    if id(data) in memo:
-        return 0
-
-    ## Preperation for examination of the data ##
-
-    # Add data to memo. This prevents us from examining 
-    # the data more than once.
-    memo.append(id(data))
-    
-    # The counter of self-references
-    counter = 0
-    
-    ## Investigate data's attributes through get descriptors and its iterator
-    get_descriptor_dict = _descriptors(data)
-    id2obj = {}
-    referenced_objects = {}
-    
-    ## Collect attributes
-    for name, get_descriptor in get_descriptor_dict.items():
-        try:
-            value = get_descriptor.__get__(data, type(data))
-            id2obj[id(value)] = value
-            referenced_objects.setdefault(id(value), 0)
-            referenced_objects[id(value)] += 1
-        except AttributeError:
-            pass
-        
-    ### Collect iterator yields
-    if isinstance(data, _collections_abc.Mapping):
-        for key, value in data.items():
-            # Key
-            id2obj[id(key)] = key
-            referenced_objects.setdefault(id(key), 0)
-            referenced_objects[id(key)] += 1
-            # Value
-            id2obj[id(value)] = value
-            referenced_objects.setdefault(id(value), 0)
-            referenced_objects[id(value)] += 1
-    elif isinstance(data, _collections_abc.Iterable):
-        iterator = iter(data)
-        try:
-            while True:
-                item = next(iterator)
-                id2obj[id(item)] = item
-                referenced_objects.setdefault(id(item), 0)
-                referenced_objects[id(item)] += 1
-        except Exception:
-            pass          
-    
-    ### Investigate objects solely dependent on the data
-    for id_, count in referenced_objects.items():
-        value = id2obj[id_]
-        # Add 1 if value is obj. Value must have
-        # come from obj, because we have searching
-        # obj and its dependents
-        if value is obj:
-            counter += count        
-        # Recurse if value totally dependent on data
-        if sys.getrefcount(value) - 3 <= count: # Subtract id2obj, value, param
-            counter += _get_circular_ref_count(obj, value, memo, data)
-     # We're done! Return the counter.
-    return counter
+    # The traversal uses an explicit stack, so deep object
+    # graphs can't exceed the recursion limit.
+    if not _traversal_lock.acquire(False):
+        return _count_circular_refs(obj, data, [], {}, {}, {})
+    try:
+        return _count_circular_refs(obj, data, _traversal_stack, _traversal_visited,
+                                    _traversal_counts, _traversal_children)
+    finally:
+        _traversal_stack.clear()
+        _traversal_visited.clear()
+        _traversal_counts.clear()
+        _traversal_children.clear()
+        _traversal_lock.release()
+
+# type -> whether pyweakrefs to its instances are allowed.
+# register() drops the entry of the class it enables.
+_eligible_types = weakref.WeakKeyDictionary()
+
+def _is_eligible_type(cls):
+    try:
+        return _eligible_types[cls]
+    except KeyError:
+        pass
+    if cls is type:
+        eligible = True
+    elif isinstance(cls.__dict__.get("__pyweakref__", None), ReferenceDescriptor):
+        eligible = True
+    else:
+        # Types whose instances CPython can weakly reference
+        eligible = cls.__weakrefoffset__ != 0
+    _eligible_types[cls] = eligible
+    return eligible
 
 def _is_eligible(obj):
-    cls = type(obj)
-    if cls is type:
-        return True
-    if isinstance(cls.__dict__.get("__pyweakref__", None), ReferenceDescriptor):
-        return True
-    return isinstance(cls.__dict__.get('__weakref__', None), types.GetSetDescriptorType)
+    return _is_eligible_type(type(obj))
 
 def _is_get_descriptor(obj):
     if callable(obj):
@@ -174,66 +383,501 @@ def _is_get_descriptor(obj):
     getfunc = getattr(cls, "__get__", None)
     return callable(getfunc)
 
-def _numpy_circular_ref_count(obj):
-    if isinstance(obj,  (nptypes.bool_, nptypes.number, nptypes.flexible)):
-        return 0
-    if isinstance(obj, np.ndarray):
-        if issubclass(obj.dtype.type, (nptypes.bool_, nptypes.number, nptypes.flexible)):
-            return 0
-        print(list(obj))
-        return _get_circular_ref_count(obj, list(obj), None, obj)
-    return NotImplemented
-
 # Whether purging is enabled. Starts off as False.
 # Enabled in final touches.
 _purge = False
 
-def _purge_func(chain=True):
-
-    # Number of weak references purged
-    purged = 0
-
-    # For every (id, ref) pair in the registry,
-    # check if the number of references of ref()
-    # is less or equal to the threshold for purging.
-    # If so, purge the reference and add 1 to purged.
+## Generations ##
+
+# Referents are tracked in generations, which map their serial numbers
+# to their ids, youngest first. A new
+# referent enters generation 0. A referent which survives a scan of its
+# generation is promoted to the next one, where it is scanned less often.
+# Generation n is scanned every _generation_intervals[n] cycles, so the
+# cost of a cycle follows the churn of the registry, not its size.
+_generations = ({}, {}, {})
+_generation_intervals = [1, 4, 16]
+
+# Number of purge cycles run by the timer
+_purge_cycles = 0
+
+# Guards the registries and the generations. The timer thread purges
+# while other threads create references.
+_registry_lock = threading.RLock()
+
+def _due_generation():
+    # Return the oldest generation due for a scan this cycle.
+    global _purge_cycles
+    _purge_cycles += 1
+    generation = 0
+    for gen, interval in enumerate(_generation_intervals):
+        if _purge_cycles % interval == 0:
+            generation = gen
+    return generation
+
+def _purge_referent(serial, id_):
+    # Purge the referent with the given serial number and id if only
+    # its pyweakrefs and its circular references keep it alive. Return
+    # True if it has been purged, or is gone already.
     #
-    # To purge an reference means to delete it from
-    # the registry and make it reference None instead
-    # of its object. 
-    # 
-    # The object is then garbage collected (see below).
-    for id_, ref_list in tuple(_reference_id_registry.items()):
-        if not ref_list:
+    # To purge a reference means to delete it from the registry and
+    # make it reference None instead of its object.
+    head = _referent_heads.get(id_, -1)
+    if head < 0 or _slot_serials[head] != serial:
+        return True
+    # Proxies forward attribute access, read their slots directly.
+    obj = object.__getattribute__(_slot_refs[head], "_referent_obj")
+    # Count the references last: the descriptor analyzer may run code
+    # of obj which creates pyweakrefs to it.
+    threshold = circular_reference_count(obj) + _slot_counts[head]
+    count = sys.getrefcount(obj) - 2
+    # Scanned and purged referents, by type
+    by_type = _cycle_stats["types"].get(type(obj))
+    if by_type is None:
+        by_type = _cycle_stats["types"][type(obj)] = [0, 0]
+    by_type[0] += 1
+    if count > threshold:
+        return False
+    by_type[1] += 1
+    # Only objects the garbage collector tracks can be left in
+    # a reference cycle once purged.
+    if gc.is_tracked(obj):
+        global _sweep_collect
+        if _sweep_collect < 2:
+            _sweep_collect = max(_sweep_collect, _gc_generation(obj))
+    # Callbacks are queued, and delivered once the slice is done.
+    del _referent_heads[id_]
+    slot = head
+    while slot >= 0:
+        ref = _slot_refs[slot]
+        object.__setattr__(ref, "_referent_obj", None)
+        callback = object.__getattribute__(ref, "_callback_func")
+        if callable(callback):
+            _pending_callbacks.append((callback, ref))
+        waiters = _death_waiters.pop(id(ref), None)
+        if waiters:
+            _notify_dead(waiters[1])
+        slot = _free_slot(slot)
+    return True
+
+## Sweeps ##
+
+# A sweep is the list of (generation, serial) pairs due for a scan, oldest
+# generation first so promoted survivors are not scanned twice. It is
+# processed in slices; the cursor remembers where the last slice stopped.
+_sweep = []
+_sweep_cursor = 0
+# Oldest generation in the sweep, -1 when no sweep is in progress
+_sweep_generation = -1
+# Number of referents purged by the sweep so far
+_sweep_purged = 0
+# Oldest garbage collector generation holding an object the sweep
+# purged, -1 if none. Only that one and the younger ones are collected.
+_sweep_collect = -1
+
+# ids of the objects in the two young garbage collector generations,
+# listed once per slice, when an object is purged
+_young_objects = None
+
+def _gc_generation(obj):
+    # Return the garbage collector generation obj is in. The young
+    # generations are small, so listing them is cheap.
+    global _young_objects
+    if _young_objects is None:
+        _young_objects = [{id(o) for o in gc.get_objects(generation)}
+                          for generation in (0, 1)]
+    for generation, ids in enumerate(_young_objects):
+        if id(obj) in ids:
+            return generation
+    return 2
+
+# Budget of each timer-driven slice, (max_seconds, max_objects).
+# None means unlimited.
+_purge_budget = [None, None]
+
+# Seconds between two slices of the same sweep
+_slice_pause = 0.01
+
+def _extend_sweep(generation):
+    # Queue the generations between the oldest one in
+    # the sweep and the given one, oldest first.
+    global _sweep_generation
+    if generation <= _sweep_generation:
+        return
+    pending = []
+    for gen in reversed(range(_sweep_generation + 1, generation + 1)):
+        pending.extend((gen, serial) for serial in _generations[gen])
+    _sweep[_sweep_cursor:_sweep_cursor] = pending
+    _sweep_generation = generation
+
+def _run_sweep(max_seconds=None, max_objects=None, stop=None):
+    # Process the sweep until it is done, the budget runs out or
+    # stop() returns True. Return the number of (generation, serial)
+    # pairs left.
+    global _sweep_cursor, _sweep_generation, _sweep_purged
+    deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+    scanned = 0
+    last = len(_generations) - 1
+    while _sweep_cursor < len(_sweep):
+        if max_objects is not None and scanned >= max_objects:
+            break
+        if deadline is not None and scanned and time.perf_counter() >= deadline:
+            break
+        if stop is not None and stop():
+            break
+        gen, serial = _sweep[_sweep_cursor]
+        _sweep_cursor += 1
+        generation = _generations[gen]
+        id_ = generation.get(serial)
+        # Purged, compacted or promoted since the sweep started
+        if id_ is None:
             continue
-        ref = ref_list[0]
-        obj = ref()
-        count = sys.getrefcount(obj) - 2
-        threshold = circular_reference_count(obj) + get_pyweakref_count(obj)
-        if count <= threshold:
-            for ref in ref_list:
-                if callable(ref.__callback__):
-                    ref.__callback__.__call__(ref)
-                _reference_registry[id(ref)] = None, None
-            purged += 1
-            del _reference_id_registry[id(obj)] 
-
-    # If a reference has been purged, run the garbage
-    # collector now.
-    if purged:
-        gc.collect()
-
-    # If purging has been enabled and the chain parameter is
-    # True, then we schedule a call of this function in 5
-    # seconds.
-    if purging() and chain:
-        global _purge_timer
-        _purge_timer = threading.Timer(5.0, _purge_func)
-        _purge_timer.start()        
-
-# The purge timer. Starts at None,
-# initialized and updated when purging is enabled.
-_purge_timer = None 
+        scanned += 1
+        if _purge_referent(serial, id_):
+            del generation[serial]
+            _sweep_purged += 1
+            _cycle_stats["purged"] += 1
+        elif gen < last:
+            del generation[serial]
+            _generations[gen + 1][serial] = id_
+    _cycle_stats["scanned"] += scanned
+    remaining = len(_sweep) - _sweep_cursor
+    if not remaining:
+        _sweep.clear()
+        _sweep_cursor = 0
+        _sweep_generation = -1
+    return remaining
+
+def _purge_func(chain=True, generation=None, max_seconds=None, max_objects=None,
+                collect=None, stop=None):
+
+    # A sweep scans every generation up to and including the given
+    # one. The purger thread starts a new sweep once the last one is
+    # done, its generation picked by the cycle count. An explicit
+    # generation extends the sweep in progress.
+    #
+    # The objects are then garbage collected (see below), by calling
+    # collect with the oldest generation to collect. Without collect,
+    # a slice without budget runs gc.collect, and a budgeted one leaves
+    # the collection to the interpreter, so it stays within its budget.
+    global _sweep_purged, _sweep_collect, _sweep_seconds, _new_referents, _cycle_stats
+    global _young_objects
+    if chain and max_seconds is None and max_objects is None:
+        max_seconds, max_objects = _purge_budget
+    started = time.perf_counter()
+    cpu_started = time.thread_time()
+    with _registry_lock:
+        _cycle_stats = {"scanned": 0, "purged": 0, "types": {}}
+        nodes = _nodes_traversed
+        if generation is None and _sweep_generation < 0:
+            generation = _due_generation()
+        if generation is not None:
+            _extend_sweep(generation)
+        remaining = _run_sweep(max_seconds, max_objects, stop)
+        _young_objects = None
+        purged = 0
+        generation_collected = -1
+        if not remaining:
+            purged, _sweep_purged = _sweep_purged, 0
+            generation_collected, _sweep_collect = _sweep_collect, -1
+        cycle = _cycle_stats
+        # Compact the registry with what is left of the budget once
+        # the sweep is done.
+        cycle["compacted"] = 0
+        if not remaining:
+            seconds = objects = None
+            if max_seconds is not None:
+                seconds = max_seconds - (time.perf_counter() - started)
+            if max_objects is not None:
+                objects = max_objects - cycle["scanned"]
+            if (seconds is None or seconds > 0) and (objects is None or objects > 0):
+                cycle["compacted"] = _compact(seconds, objects)
+        cycle["nodes"] = _nodes_traversed - nodes
+
+    # Deliver the callbacks of the purged pyweakrefs.
+    callbacks_started = time.perf_counter()
+    if _pending_callbacks:
+        _dispatch_callbacks()
+    cycle["callback_time"] = time.perf_counter() - callbacks_started
+
+    # If the finished sweep purged an object which may be left in a
+    # reference cycle, collect the generations it can be in now. When
+    # sweeps follow the collector's own collections, leave it to the
+    # next one.
+    if collect is None and max_seconds is None and max_objects is None:
+        collect = gc.collect
+    if collect is not None and generation_collected >= 0 and not (chain and _trigger == "gc"):
+        collect(generation_collected)
+
+    cycle["wall_time"] = time.perf_counter() - started
+    cycle["cpu_time"] = time.thread_time() - cpu_started
+    cycle["remaining"] = remaining
+    _record_cycle(cycle)
+
+    # If the chain parameter is True, the sweep was automatic:
+    # once it is done, adapt the interval to its yield and cost.
+    _sweep_seconds += cycle["wall_time"]
+    if not remaining:
+        if chain:
+            _adapt_interval(purged, _sweep_seconds)
+            _new_referents = 0
+        _sweep_seconds = 0.0
+
+    return remaining
+
+## Statistics ##
+
+# Totals of all cycles. "types" maps a referent type
+# to [scanned, purged].
+_stats = {
+    "cycles": 0,
+    "wall_time": 0.0,
+    "cpu_time": 0.0,
+    "scanned": 0,
+    "purged": 0,
+    "nodes": 0,
+    "compacted": 0,
+    "callbacks": 0,
+    "callback_time": 0.0,
+    "types": {},
+}
+_stats_lock = threading.Lock()
+
+# Counters of the cycle in progress
+_cycle_stats = {"scanned": 0, "purged": 0, "types": {}}
+
+# Functions called with the statistics of each cycle
+_stats_subscribers = []
+
+def _type_name(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+def _record_cycle(cycle):
+    # Add the cycle to the totals, then report it to the subscribers.
+    with _stats_lock:
+        _stats["cycles"] += 1
+        for key in ("wall_time", "cpu_time", "scanned", "purged", "nodes", "compacted"):
+            _stats[key] += cycle[key]
+        totals = _stats["types"]
+        for cls, (scanned, purged) in cycle["types"].items():
+            total = totals.setdefault(_type_name(cls), [0, 0])
+            total[0] += scanned
+            total[1] += purged
+    if not _stats_subscribers:
+        return
+    cycle["types"] = {_type_name(cls): tuple(counts) for cls, counts in cycle["types"].items()}
+    for subscriber in tuple(_stats_subscribers):
+        try:
+            subscriber(cycle)
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+
+## Purger thread ##
+
+# A single daemon thread runs the automatic sweeps. It sleeps on
+# _purge_condition between them, and forever while purging is disabled.
+# It is started with the first referent, not at import.
+_purge_condition = threading.Condition()
+_purge_thread = None
+
+# Seconds between two automatic sweeps. It halves after a sweep which
+# purges something, or when the registry grows fast, and doubles after
+# one which purges nothing, within _interval_bounds. It is also kept
+# at least 10 times the cost of the last sweep.
+_interval = 5.0
+_interval_bounds = [1.0, 60.0]
+
+# Number of referents registered since the last automatic sweep.
+# Reaching _growth_trigger wakes the purger thread early.
+_new_referents = 0
+_growth_trigger = 10000
+
+# Seconds spent on the sweep in progress
+_sweep_seconds = 0.0
+
+def _adapt_interval(purged, cost):
+    global _interval
+    minimum, maximum = _interval_bounds
+    if purged or _new_referents >= _growth_trigger:
+        interval = _interval / 2
+    else:
+        interval = _interval * 2
+    interval = max(interval, cost * 10)
+    _interval = min(max(interval, minimum), maximum)
+
+# Set to start a sweep without waiting for the interval
+_sweep_requested = False
+
+def _wake_purger():
+    # Let the purger thread see new settings. It recomputes
+    # when the next sweep is due, and does not sweep early.
+    with _purge_condition:
+        _purge_condition.notify()
+
+def _request_sweep():
+    global _sweep_requested
+    with _purge_condition:
+        _sweep_requested = True
+        _purge_condition.notify()
+
+def _start_purger():
+    # Start the purger thread, or wake it if it is running.
+    global _purge_thread
+    if _purge_thread is None or not _purge_thread.is_alive():
+        _purge_thread = threading.Thread(target=_purge_worker, name="pyweakref-purger",
+                                         daemon=True)
+        _purge_thread.start()
+    else:
+        _wake_purger()
+
+def _purge_worker():
+    global _gc_triggered, _sweep_requested
+    remaining = 0
+    last = time.monotonic()
+    while True:
+        with _purge_condition:
+            while True:
+                if not _purge or _async_purgers:
+                    # Disabled, or an asyncio purger is running instead.
+                    # Count the interval from when this changes.
+                    _purge_condition.wait()
+                    last = time.monotonic()
+                    continue
+                if _gc_triggered or _sweep_requested:
+                    break
+                # Resume an unfinished sweep soon. Otherwise, wait for
+                # the interval, or for a collection when the gc triggers
+                # sweeps. Recomputed on each wake, so that new settings
+                # apply at once.
+                if remaining:
+                    timeout = last + _slice_pause - time.monotonic()
+                elif _trigger == "gc":
+                    timeout = None
+                else:
+                    timeout = last + _interval - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                _purge_condition.wait(timeout)
+            _gc_triggered = _sweep_requested = False
+        # Stand down as soon as an asyncio purger starts.
+        remaining = _purge_func(stop=_async_purging)
+        last = time.monotonic()
+
+## Callback dispatch ##
+
+# (callback, pyweakref) pairs of purged pyweakrefs, not yet delivered
+_pending_callbacks = collections.deque()
+
+# How callbacks are delivered: "inline" (by the purging thread, after
+# each slice), "thread" (by a dedicated daemon thread) or an executor
+# with a submit() method, such as a concurrent.futures.Executor.
+_dispatcher = "inline"
+
+# Wakes the dispatcher thread
+_callback_condition = threading.Condition()
+_callback_thread = None
+
+def _drain_callbacks():
+    batch = []
+    while _pending_callbacks:
+        batch.append(_pending_callbacks.popleft())
+    return batch
+
+def _deliver_callbacks(batch):
+    # An exception raised by one callback is reported,
+    # and doesn't stop the delivery of the others.
+    started = time.perf_counter()
+    for callback, ref in batch:
+        try:
+            callback(ref)
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+    with _stats_lock:
+        _stats["callbacks"] += len(batch)
+        _stats["callback_time"] += time.perf_counter() - started
+
+def _dispatch_callbacks():
+    global _callback_thread
+    dispatcher = _dispatcher
+    if dispatcher == "inline":
+        _deliver_callbacks(_drain_callbacks())
+    elif dispatcher == "thread":
+        if _callback_thread is None or not _callback_thread.is_alive():
+            _callback_thread = threading.Thread(target=_callback_worker,
+                                                name="pyweakref-callbacks", daemon=True)
+            _callback_thread.start()
+        with _callback_condition:
+            _callback_condition.notify()
+    elif hasattr(dispatcher, "call_soon_threadsafe"):
+        # An asyncio event loop
+        dispatcher.call_soon_threadsafe(_deliver_callbacks, _drain_callbacks())
+    else:
+        dispatcher.submit(_deliver_callbacks, _drain_callbacks())
+
+def _callback_worker():
+    while True:
+        with _callback_condition:
+            while not _pending_callbacks:
+                _callback_condition.wait()
+        _deliver_callbacks(_drain_callbacks())
+
+## asyncio ##
+
+# id(ref) -> (ref, asyncio futures returned by ref.wait_dead()).
+# Holding ref keeps it registered until its object is purged.
+_death_waiters = {}
+
+# Number of running async_purger() tasks. While there is one,
+# the purger thread leaves the sweeps to it.
+_async_purgers = 0
+
+def _async_purging():
+    return _async_purgers > 0
+
+def _set_dead(future):
+    if not future.done():
+        future.set_result(None)
+
+def _notify_dead(futures):
+    for future in futures:
+        try:
+            future.get_loop().call_soon_threadsafe(_set_dead, future)
+        except RuntimeError:
+            # The event loop is closed.
+            pass
+
+def _drop_done_waiters(ref):
+    # Release ref once all its futures are done (e.g. cancelled),
+    # so that compaction can free it.
+    waiters = _death_waiters.get(id(ref))
+    if waiters is not None and all(future.done() for future in waiters[1]):
+        del _death_waiters[id(ref)]
+
+## Garbage collector trigger ##
+
+# What starts automatic sweeps: "timer" (the adaptive interval) or
+# "gc" (the collections of generation _gc_trigger_generation or older
+# which the interpreter runs anyway).
+_trigger = "timer"
+_gc_trigger_generation = 2
+
+# Set by _gc_callback when the purger thread is busy, so it
+# starts another sweep instead of going to sleep.
+_gc_triggered = False
+
+def _gc_callback(phase, info):
+    # Called by the garbage collector. Don't purge here: wake
+    # the purger thread, without blocking the collection.
+    global _gc_triggered
+    if phase != "stop" or info["generation"] < _gc_trigger_generation:
+        return
+    _gc_triggered = True
+    if _purge_condition.acquire(False):
+        try:
+            _purge_condition.notify()
+        finally:
+            _purge_condition.release()
+
 
 # The type of ReferenceDescriptor's __doc__ attribute. ReferenceDescriptor's
 # __doc__ displays one message without an instance and another with an instance.
@@ -250,34 +894,389 @@ class _reference_descriptor_doc_type(object):
             Descriptor which allows a pyweakref.ref to instances of a class,
             without using __weakref__.
 
-            Unless a class has a __weakref__ descriptor, it should be register()ed. 
+            Unless CPython can weakly reference its instances, a class should be register()ed. 
             It is bad programming practice to'register' a class without using register()."""
         else:
             # Result of r.__doc__ where isinstance(r, ReferenceDescriptor)
-            return "list to the pure python weak references of the object"
+            return "view of the pure python weak references and proxies of the object"
 
     __slots__ = ()
     
-def _referent(ref):
-    return _reference_registry[id(ref)][0]
-
-def _proxied(proxy):
-    return _referent(_proxy_registry[id(proxy)])
-
-def _proxy_callback(proxy):
-    return _callback(_proxy_registry[id(proxy)])
-
 ## Registries ##
 
-# proxy -> ref
-_proxy_registry = {}
-
-# id(referent) -> ref
-_reference_id_registry = {}
-
-# ref -> (referent, callback)
-_reference_registry = {}
+# Pyweakrefs and proxies hold their object and callback themselves.
+# The registry only indexes them for the purger: each live one
+# occupies a slot of these parallel arrays, holding it and the next
+# slot of a pyweakref to the same object (-1 for the last one).
+# The head slot of an object also holds its serial number, and its
+# number of pyweakrefs. Once the object is gone, its stale serial
+# cannot match a new object at the same address. Purged slots are
+# pushed on _free_slots, and reused first.
+_slot_refs = []
+_slot_next = array.array("q")
+_slot_serials = array.array("q")
+_slot_counts = array.array("q")
+_free_slots = []
+
+# id(referent) -> slot of its most recent pyweakref
+_referent_heads = {}
+
+_serial_counter = itertools.count()
+
+def _is_canonical(ref):
+    # The shared pyweakref of an object: a plain one without callback
+    return type(ref) is ReferenceType and ref._callback_func is None
+
+def _canonical(obj):
+    # Return the shared pyweakref to obj, or None.
+    # It is always kept in the head slot of obj.
+    head = _referent_heads.get(id(obj), -1)
+    if head >= 0:
+        ref = _slot_refs[head]
+        if _is_canonical(ref):
+            return ref
+    return None
+
+def _insert(ref, obj):
+    # Give ref a slot, at the head of the slots of obj, or
+    # right after the shared pyweakref to obj, if any. Return the
+    # (serial, id) pair of obj if it is a new referent, else None.
+    global _slots_taken
+    _slots_taken += 1
+    id_ = id(obj)
+    head = _referent_heads.get(id_, -1)
+    if head >= 0 and _is_canonical(_slot_refs[head]) and not _is_canonical(ref):
+        prev, next_ = head, _slot_next[head]
+    else:
+        prev, next_ = -1, head
+    if _free_slots:
+        slot = _free_slots.pop()
+        _slot_refs[slot] = ref
+        _slot_next[slot] = next_
+    else:
+        slot = len(_slot_refs)
+        _slot_refs.append(ref)
+        _slot_next.append(next_)
+        _slot_serials.append(-1)
+        _slot_counts.append(0)
+    if prev >= 0:
+        _slot_next[prev] = slot
+        _slot_counts[head] += 1
+        return None
+    _referent_heads[id_] = slot
+    if head >= 0:
+        # The serial number and count move to the new head.
+        _slot_serials[slot] = _slot_serials[head]
+        _slot_counts[slot] = _slot_counts[head] + 1
+        return None
+    serial = _slot_serials[slot] = next(_serial_counter)
+    _slot_counts[slot] = 1
+    return serial, id_
+
+def _add_referents(keys):
+    # New referents join the youngest generation.
+    # keys are their (serial, id) pairs.
+    global _new_referents
+    if not keys:
+        return
+    _generations[0].update(keys)
+    if _purge_thread is None and _purge:
+        _start_purger()
+    before = _new_referents
+    _new_referents += len(keys)
+    if before < _growth_trigger <= _new_referents:
+        _request_sweep()
+
+def _register(ref, obj):
+    # Add ref to the registry.
+    with _registry_lock:
+        key = _insert(ref, obj)
+        if key is not None:
+            _add_referents((key,))
+
+def _probe(obj):
+    # Return a pyweakref to obj to look obj up in a dict or set of
+    # pyweakrefs: the shared one if any, else a transient one which is
+    # not registered. Either way, the registry is left untouched.
+    ref = _canonical(obj)
+    if ref is not None:
+        return ref
+    if not _is_eligible(obj):
+        message = "Cannot use pyweakref.ref for class {0.__module__}.{0.__qualname__} instances".format(type(obj))
+        raise TypeError(message)
+    ref = object.__new__(ReferenceType)
+    ref._referent_obj = obj
+    ref._callback_func = None
+    return ref
+
+def _ref_many(cls, objs, callback=None):
+    # Create pyweakrefs of class cls to each object of objs, and
+    # return them in a list. Eligibility is checked once per type,
+    # before any pyweakref is created, and the registry is locked
+    # once for the whole batch.
+    objs = list(objs)
+    for obj_type in {type(obj) for obj in objs}:
+        if not _is_eligible_type(obj_type):
+            message = "Cannot use pyweakref.ref for class {0.__module__}.{0.__qualname__} instances".format(obj_type)
+            raise TypeError(message)
+    shared = cls is ReferenceType and callback is None
+    refs = []
+    keys = []
+    new = object.__new__
+    with _registry_lock:
+        for obj in objs:
+            if shared:
+                ref = _canonical(obj)
+                if ref is not None:
+                    refs.append(ref)
+                    continue
+            ref = new(cls)
+            ref._referent_obj = obj
+            ref._callback_func = callback
+            key = _insert(ref, obj)
+            if key is not None:
+                keys.append(key)
+            refs.append(ref)
+        _add_referents(keys)
+    return refs
+
+def _free_slot(slot):
+    # Free a slot, and return the next slot of the same object.
+    next_ = _slot_next[slot]
+    _slot_refs[slot] = None
+    _slot_next[slot] = -1
+    _free_slots.append(slot)
+    return next_
+
+def _unlink(id_, slot):
+    # Free the slot of a pyweakref to the object with the given id.
+    head = _referent_heads[id_]
+    serial, count = _slot_serials[head], _slot_counts[head]
+    if slot == head:
+        head = _free_slot(slot)
+        if head < 0:
+            # No pyweakref to the object is left.
+            del _referent_heads[id_]
+            for generation in _generations:
+                generation.pop(serial, None)
+            return
+        # The serial number and count move to the new head.
+        _referent_heads[id_] = head
+        _slot_serials[head] = serial
+    else:
+        prev = head
+        while _slot_next[prev] != slot:
+            prev = _slot_next[prev]
+        _slot_next[prev] = _free_slot(slot)
+    _slot_counts[head] = count - 1
+
+## Compaction ##
+
+# Compaction frees the slots of the pyweakrefs and proxies which only
+# the registry still holds. A pass walks the slots from a cursor, in
+# steps charged against the budget of the slices. Pyweakrefs can only
+# die once created, so a pass starts when the slots taken since the
+# last one reach _compact_ratio of all the slots.
+_compact_cursor = -1
+_compact_ratio = 0.25
+_slots_taken = 0
+
+def _compact(max_seconds=None, max_objects=None, restart=False):
+    # Walk the slots until the pass is done or the budget runs out, and
+    # free those of the dead pyweakrefs, without calling their callbacks,
+    # as CPython does for weakrefs which die before their object. Freed
+    # slots are reused. Return the number of freed slots.
+    global _compact_cursor, _slots_taken
+    deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+    walked = freed = 0
+    with _registry_lock:
+        if restart or (_compact_cursor < 0
+                       and _slots_taken >= len(_slot_refs) * _compact_ratio):
+            _compact_cursor = 0
+            _slots_taken = 0
+        while 0 <= _compact_cursor < len(_slot_refs):
+            if max_objects is not None and walked >= max_objects:
+                break
+            if deadline is not None and walked and time.perf_counter() >= deadline:
+                break
+            slot = _compact_cursor
+            _compact_cursor += 1
+            walked += 1
+            ref = _slot_refs[slot]
+            if ref is None:
+                continue
+            if _death_waiters:
+                _drop_done_waiters(ref)
+            # Held by _slot_refs, ref, and getrefcount's argument.
+            # _death_waiters holds it while a future is pending.
+            if sys.getrefcount(ref) > 3:
+                continue
+            _unlink(id(object.__getattribute__(ref, "_referent_obj")), slot)
+            freed += 1
+            # The pyweakref dies here, and may take its object with it.
+            ref = None
+        else:
+            _compact_cursor = -1
+    return freed
+
+def _container_of(callback):
+    # Return the weak container whose removal callback is callback, or
+    # None. The callback refers to its container through the pyweakref
+    # of its first default argument.
+    from . import WeakKeyDictionary, WeakSet, WeakValueDictionary
+    if type(callback) is not types.FunctionType or not callback.__defaults__:
+        return None
+    selfref = callback.__defaults__[0]
+    if type(selfref) is not ReferenceType:
+        return None
+    container = selfref()
+    if (isinstance(container, (WeakKeyDictionary, WeakSet, WeakValueDictionary))
+            and container._remove is callback):
+        return container
+    return None
+
+def _count_of(obj):
+    # Return the number of pyweakrefs to obj.
+    with _registry_lock:
+        head = _referent_heads.get(id(obj), -1)
+        return _slot_counts[head] if head >= 0 else 0
+
+def _slots_of(obj):
+    # Yield the slots of the pyweakrefs to obj.
+    slot = _referent_heads.get(id(obj), -1)
+    while slot >= 0:
+        yield slot
+        slot = _slot_next[slot]
+
+
+## Proxies ##
+
+# Dunders a proxy forwards to its object, with their number of
+# arguments besides self
+_proxy_methods = {
+    "__abs__": 0,
+    "__add__": 1,
+    "__and__": 1,
+    "__bool__": 0,
+    "__buffer__": 1,
+    "__bytes__": 0,
+    "__contains__": 1,
+    "__delattr__": 1,
+    "__delitem__": 1,
+    "__divmod__": 1,
+    "__eq__": 1,
+    "__float__": 0,
+    "__floordiv__": 1,
+    "__ge__": 1,
+    "__getitem__": 1,
+    "__gt__": 1,
+    "__iadd__": 1,
+    "__iand__": 1,
+    "__ifloordiv__": 1,
+    "__ilshift__": 1,
+    "__imatmul__": 1,
+    "__imod__": 1,
+    "__imul__": 1,
+    "__index__": 0,
+    "__int__": 0,
+    "__invert__": 0,
+    "__ior__": 1,
+    "__ipow__": 1,
+    "__irshift__": 1,
+    "__isub__": 1,
+    "__iter__": 0,
+    "__itruediv__": 1,
+    "__ixor__": 1,
+    "__le__": 1,
+    "__len__": 0,
+    "__lshift__": 1,
+    "__lt__": 1,
+    "__matmul__": 1,
+    "__mod__": 1,
+    "__mul__": 1,
+    "__ne__": 1,
+    "__neg__": 0,
+    "__next__": 0,
+    "__or__": 1,
+    "__pos__": 0,
+    "__radd__": 1,
+    "__rand__": 1,
+    "__rdivmod__": 1,
+    "__release_buffer__": 1,
+    "__reversed__": 0,
+    "__rfloordiv__": 1,
+    "__rlshift__": 1,
+    "__rmatmul__": 1,
+    "__rmod__": 1,
+    "__rmul__": 1,
+    "__ror__": 1,
+    "__rrshift__": 1,
+    "__rshift__": 1,
+    "__rsub__": 1,
+    "__rtruediv__": 1,
+    "__rxor__": 1,
+    "__setattr__": 2,
+    "__setitem__": 2,
+    "__str__": 0,
+    "__sub__": 1,
+    "__truediv__": 1,
+    "__xor__": 1,
+}
 
+# (proxy class, type of object) -> specialized proxy class
+_proxy_classes = {}
+
+def _forwarder(base, name, func, arity):
+    # Return a method of base calling func on the object of the proxy.
+    proxied = _proxied
+    if arity == 0:
+        def method(self):
+            return func(proxied(self))
+    elif arity == 1:
+        def method(self, value):
+            return func(proxied(self), value)
+    else:
+        def method(self, name, value):
+            return func(proxied(self), name, value)
+    method.__module__ = base.__module__
+    method.__name__ = name
+    method.__qualname__ = f"{base.__qualname__}.{name}"
+    return method
+
+def _proxy_class(base, obj_type):
+    # Return the subclass of base for proxies to obj_type instances.
+    # It only has the dunders obj_type implements, bound to the
+    # functions of obj_type, so they are not looked up on each call.
+    try:
+        return _proxy_classes[base, obj_type]
+    except KeyError:
+        pass
+    namespace = {"__slots__": (), "__module__": base.__module__,
+                 "__qualname__": base.__qualname__,
+                 # Defining __eq__ would reset it
+                 "__hash__": base.__hash__}
+    for name, arity in _proxy_methods.items():
+        func = getattr(obj_type, name, None)
+        if func is not None:
+            namespace[name] = _forwarder(base, name, func, arity)
+    getattribute = obj_type.__getattribute__
+    proxied = _proxied
+    def __getattribute__(self, name):
+        try:
+            return getattribute(proxied(self), name)
+        except AttributeError:
+            return object.__getattribute__(self, name)
+    namespace["__getattribute__"] = __getattribute__
+    if base is CallableProxyType:
+        call = obj_type.__call__
+        def __call__(self, *args, **kwds):
+            return call(proxied(self), *args, **kwds)
+        namespace["__call__"] = __call__
+    cls = type(base)(base.__name__, (base,), namespace)
+    # Don't let the cache pin an unbounded number of dynamic classes.
+    if len(_proxy_classes) >= 1024:
+        _proxy_classes.clear()
+    return _proxy_classes.setdefault((base, obj_type), cls)
 
 ### Start of public API ###
 
@@ -290,6 +1289,10 @@ class AbstractProxyType(object):
     
     Use 'isinstance(obj, AbstractProxyType)' to test if the 
     object is a proxy.
+
+    Proxies are instances of a subclass of ProxyType or
+    CallableProxyType made for the type of their object,
+    which forwards the dunders that type implements.
     """
     @property
     def __callback__(self):
@@ -316,9 +1319,13 @@ class AbstractProxyType(object):
             ProxyType (normal proxy) or CallableProxyType, 
             (callable proxy), may be initiated. """
             raise TypeError(message)
-        ref = ReferenceType(obj, callback)
-        self = object.__new__(cls)
-        _proxy_registry[id(self)] = ref
+        if not _is_eligible(obj):
+            message = "Cannot use pyweakref.proxy for class {0.__module__}.{0.__qualname__} instances".format(type(obj))
+            raise TypeError(message)
+        self = object.__new__(_proxy_class(cls, type(obj)))
+        _set_proxied(self, obj)
+        _set_proxy_callback(self, callback)
+        _register(self, obj)
         return self
     
     def __reduce__(self):
@@ -331,9 +1338,9 @@ class AbstractProxyType(object):
         obj = _proxied(self)
         return f"<{type(self).__module__}.{type(self).__qualname__} object at 0x{hex(id(self))[2:].upper()}" \
                + f", to <{type(obj).__module__}.{type(obj).__qualname__} object " \
-               + f"at 0x{hex(id(_proxied(obj)))[2:].upper()}>>"    
+               + f"at 0x{hex(id(obj))[2:].upper()}>>"    
 
-    __slots__ = ()      
+    __slots__ = "_referent_obj", "_callback_func"
     
 
 class CallableProxyType(AbstractProxyType):
@@ -379,7 +1386,7 @@ class ReferenceDescriptor(object):
         "Return an attribute of instance, which is of type owner."
         if instance is None:
             return self
-        return get_pyweakrefs(instance)        
+        return ReferenceView(instance)
 
     __slots__ = ()
     
@@ -390,17 +1397,19 @@ class ReferenceType(object):
     A weak reference does not protect its object from garbage
     collection (unless purging is disabled). 
 
-    type(obj), or a superclass,  must be register()ed. 
+    type(obj), or a superclass,  must be register()ed, unless
+    CPython can weakly reference instances of type(obj): classes
+    with __weakref__, their subclasses, functions or array.array.
     Otherwise, TypeError is raised."""
 
     def __call__(self):
         "Implement self()."
         # Return self's object
-        return _referent(self)
+        return self._referent_obj
     
     @property
     def __callback__(self):
-        return _callback(self)
+        return self._callback_func
 
     def __eq__(self, other):
         "Return self==other"
@@ -413,8 +1422,17 @@ class ReferenceType(object):
 
     def __hash__(self):
         "Return hash(self)."
-        # Return the hash value of self's object
-        return hash(self())
+        # Return the hash value of self's object. It is kept,
+        # so a dead pyweakref can still be found in a dict.
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        obj = self._referent_obj
+        if obj is None:
+            raise TypeError("weak object has gone away")
+        self._hash = hash(obj)
+        return self._hash
     
     def __init__(self, obj, callback=None):
         pass
@@ -427,17 +1445,23 @@ class ReferenceType(object):
 
     def __new__(cls, obj, callback=None):
         "Create and return a new object.  See help(type) for accurate signature."
-        # Check if type(obj) is register()ed
+        # Check if type(obj) is register()ed, or weakly referenceable
         if not _is_eligible(obj):
             message = "Cannot use pyweakref.ref for class {0.__module__}.{0.__qualname__} instances".format(type(obj))
             raise TypeError(message)
-        # Create a new pyweakref...
-        self = object.__new__(cls)
-        # ...set its object and callback..
-        _reference_registry[id(self)] = obj, callback
-        # ...add it to the registry...
-        _reference_id_registry.setdefault(id(obj), [])
-        _reference_id_registry[id(obj)].append(self)
+        with _registry_lock:
+            # Plain pyweakrefs without callback are shared, like weakrefs
+            if cls is ReferenceType and callback is None:
+                self = _canonical(obj)
+                if self is not None:
+                    return self
+            # Create a new pyweakref...
+            self = object.__new__(cls)
+            # ...set its object and callback...
+            self._referent_obj = obj
+            self._callback_func = callback
+            # ...add it to the registry...
+            _register(self, obj)
         # ...and return it. Whew!
         return self
     
@@ -447,6 +1471,22 @@ class ReferenceType(object):
     def __reduce_ex__(self, protocol):
         raise TypeError("cannot pickle pyweakref object")
 
+    def wait_dead(self):
+        """Return an asyncio future which is done once the object
+        has been purged.
+
+        Call it from the running event loop, and await the future.
+        The pyweakref stays registered until the future is done, even
+        if nothing else holds it."""
+        import asyncio
+        future = asyncio.get_running_loop().create_future()
+        with _registry_lock:
+            if self._referent_obj is None:
+                future.set_result(None)
+            else:
+                _death_waiters.setdefault(id(self), (self, []))[1].append(future)
+        return future
+
     def __repr__(self):
         "Return repr(self)."
         base = f"<pyweakref at 0x{hex(id(self))[2:].upper()}, "
@@ -458,7 +1498,94 @@ class ReferenceType(object):
         else:
             return base + "dead>"
 
-    __slots__ = () 
+    __slots__ = "_referent_obj", "_callback_func", "_hash"
+
+class ReferenceView(_collections_abc.Sequence):
+    """ReferenceView(obj) -> read-only view of the pyweakrefs and
+    proxies to obj.
+
+    The view reflects later changes, without copying the pyweakrefs.
+    Its length is computed in constant time."""
+
+    def __init__(self, obj):
+        self._obj = obj
+
+    def __len__(self):
+        "Return len(self)."
+        return _count_of(self._obj)
+
+    def __iter__(self):
+        "Implement iter(self)."
+        obj = self._obj
+        with _registry_lock:
+            slot = _referent_heads.get(id(obj), -1)
+        while slot >= 0:
+            with _registry_lock:
+                # The slot may have been freed, and reused for
+                # another object, since the last step.
+                ref = _slot_refs[slot]
+                if ref is None or object.__getattribute__(ref, "_referent_obj") is not obj:
+                    return
+                slot = _slot_next[slot]
+            yield ref
+
+    def __getitem__(self, index):
+        "Return self[index]."
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("ReferenceView index out of range")
+        for i, ref in enumerate(self):
+            if i == index:
+                return ref
+        raise IndexError("ReferenceView index out of range")
+
+    def __repr__(self):
+        "Return repr(self)."
+        return f"{type(self).__qualname__}({list(self)!r})"
+
+    __slots__ = "_obj",
+
+async def async_purger(slice_seconds: float = 0.005) -> None:
+    """Purge from the running event loop until cancelled.
+
+    Purge cycles run in slices of at most slice_seconds seconds, between
+    the other callbacks of the loop, instead of on the purger thread.
+    Start it with asyncio.create_task(async_purger())."""
+    import asyncio
+    global _async_purgers
+    loop = asyncio.get_running_loop()
+
+    def collect(generation):
+        # Collect in a callback of its own, not in the slice.
+        loop.call_soon(gc.collect, generation)
+
+    _async_purgers += 1
+    try:
+        while True:
+            remaining = 0
+            if _purge:
+                # The purger thread stands down after the object it is
+                # scanning. Don't block the loop until it has.
+                if not _registry_lock.acquire(False):
+                    await asyncio.sleep(_slice_pause)
+                    continue
+                _registry_lock.release()
+                remaining = _purge_func(True, max_seconds=slice_seconds, collect=collect)
+            await asyncio.sleep(0 if remaining else _interval)
+    finally:
+        _async_purgers -= 1
+        _wake_purger()
+
+def compact() -> int:
+    """Free the registry entries of the pyweakrefs and proxies which
+    are no longer used. New ones reuse the freed entries.
+
+    Their callbacks are not called. Compaction also runs in steps after
+    the purge cycles, once enough pyweakrefs have been created since the
+    last one. Return the number of freed entries."""
+    return _compact(restart=True)
 
 def circular_reference_count(obj: typing.Any) -> int:
     """Return the number of circular references to the object.
@@ -466,10 +1593,6 @@ def circular_reference_count(obj: typing.Any) -> int:
     For the purposes of this function, the circular reference
     must be only accessible (directly or indirectly) through the object.
     """
-    if np is not None:
-        result = _numpy_circular_ref_count(obj)
-        if result is not NotImplemented:
-            return result
     return _get_circular_ref_count(obj)
 
 def disable_purging() -> None:
@@ -477,38 +1600,176 @@ def disable_purging() -> None:
 
     Without purging, pyweakref.ref instances will not be weak references,
     rather strong references. Think twice before calling this function."""
-    global _purge, _purge_timer
+    global _purge
     if purging():
         _purge = False
-        _purge_timer.cancel()
+        _wake_purger()
 
 def enable_purging() -> None:
     """Enable purging.
 
     Only with purging, pyweakref.ref instances will be weak references,
     not strong references."""
-    global _purge, _purge_timer
+    global _purge
     if not purging():
         _purge = True
-        _purge_timer = threading.Timer(5.0, _purge_func)
-        _purge_timer.start()
+        # Without referents, leave it to the first one.
+        if _referent_heads or _purge_thread is not None:
+            _start_purger()
         
+def get_analyzer() -> str:
+    """Return the name of the strategy which finds the objects
+    another object refers to, "descriptor" or "gc"."""
+    return _analyzer
+
+def get_callback_dispatcher() -> typing.Any:
+    """Return how the callbacks of purged pyweakrefs are delivered:
+    "inline", "thread", an executor or an event loop."""
+    return _dispatcher
+
+def get_generation_intervals() -> tuple[int, ...]:
+    """Return how often each generation is scanned, youngest first.
+
+    Generation n is scanned once every get_generation_intervals()[n]
+    purge cycles."""
+    return tuple(_generation_intervals)
+
+def get_purge_interval() -> float:
+    """Return the number of seconds between two automatic purge cycles.
+
+    The interval adapts to the cycles: it grows while they purge
+    nothing and shrinks when they do, or when many new objects
+    are referenced."""
+    return _interval
+
+def get_purge_trigger() -> tuple[str, int]:
+    """Return what starts automatic purge cycles, and the
+    generation of the collections which do in "gc" mode."""
+    return _trigger, _gc_trigger_generation
+
 def get_pyweakref_count(obj: typing.Any) -> int:
-    "Return number of pyweakrefs to obj."
-    return len(get_pyweakrefs(obj))
+    "Return number of pyweakrefs and proxies to obj."
+    return _count_of(obj)
         
-def get_pyweakrefs(obj: typing.Any) -> list[ReferenceType]:
-    """Return all pyweakrefs to obj. 
-    If none, return an empty list."""
-    seq = _reference_id_registry.get(id(obj), [])
-    return [seq[0] for item in seq]
-
-def purge() -> None:
+def get_pyweakrefs(obj: typing.Any) -> list[typing.Union[ReferenceType, AbstractProxyType]]:
+    """Return all pyweakrefs and proxies to obj. 
+    If none, return an empty list.
+
+    Proxies forward calls: calling one calls obj, if callable."""
+    with _registry_lock:
+        return [_slot_refs[slot] for slot in _slots_of(obj)]
+
+def memory_report(sample: int = 1000) -> dict:
+    """Return the approximate memory used by pyweakref, in bytes.
+
+    The result maps "registry" to the bytes of each index of the
+    registry, by name, "refs" to the bytes of the pyweakrefs and proxies,
+    "containers" to the bytes of the internals of the weak containers
+    holding pyweakrefs (data, pending removals), by container type, "finalize"
+    to the bytes of the finalize registry, "types" to the bytes of the
+    pyweakrefs, proxies and finalizers by type of their object, and
+    "total" to the sum.
+
+    At most sample pyweakrefs and finalizers are measured, and the
+    totals extrapolated, so the report takes bounded time. Containers
+    are found from the sampled pyweakrefs."""
+    import random
+    from . import finalize
+    if sample < 1:
+        raise ValueError("sample must be positive")
+    size = sys.getsizeof
+    types_ = collections.Counter()
+
+    # Fixed-size estimate of a serial number. The id it maps to
+    # is shared with _referent_heads.
+    key_size = size(1 << 40)
+    with _registry_lock:
+        registry = {
+            "slot_refs": size(_slot_refs),
+            "slot_next": size(_slot_next),
+            "slot_serials": size(_slot_serials),
+            "slot_counts": size(_slot_counts),
+            "free_slots": size(_free_slots),
+            "referent_heads": size(_referent_heads),
+            "generations": sum(size(gen) + len(gen) * key_size for gen in _generations),
+            "sweep": size(_sweep),
+            "pending_callbacks": size(_pending_callbacks),
+            "death_waiters": size(_death_waiters),
+        }
+        live = len(_slot_refs) - len(_free_slots)
+        slots = range(len(_slot_refs))
+        if len(slots) > sample:
+            slots = random.sample(slots, sample)
+        refs = [_slot_refs[slot] for slot in slots]
+    refs = [wr for wr in refs if wr is not None]
+    containers = collections.Counter()
+    # Proxies forward attribute access, __sizeof__ included.
+    for wr in refs:
+        obj = object.__getattribute__(wr, "_referent_obj")
+        types_[_type_name(type(obj))] += object.__sizeof__(wr)
+        # A container holding n pyweakrefs is met n times as often,
+        # so each pyweakref accounts for 1/n of its internals.
+        container = _container_of(object.__getattribute__(wr, "_callback_func"))
+        if container is not None:
+            containers[type(container).__qualname__] += (
+                size(container.data) + size(container._pending_removals)
+                + size(container._iterating)) / max(len(container.data), 1)
+    scale = live / len(refs) if refs else 0
+    for name in types_:
+        types_[name] *= scale
+    for name in containers:
+        containers[name] *= scale
+    refs_bytes = sum(types_.values())
+
+    # Sample a run of finalizers from a random offset, so the registry
+    # is not copied. islice skips to the offset without running Python
+    # code, so the registry can't change meanwhile.
+    total = len(finalize._registry)
+    start = random.randrange(total - sample + 1) if total > sample else 0
+    sampled = list(itertools.islice(finalize._registry.items(), start, start + sample))
+    by_type = collections.Counter()
+    for finalizer, info in sampled:
+        by_type[_type_name(type(info.weakref()))] += (
+            object.__sizeof__(finalizer) + size(info) + size(info.args)
+            + (size(info.kwargs) if info.kwargs else 0))
+    scale = total / len(sampled) if sampled else 0
+    for name in by_type:
+        by_type[name] *= scale
+    types_.update(by_type)
+    finalize_bytes = size(finalize._registry) + sum(by_type.values())
+
+    report = {
+        "registry": registry,
+        "refs": round(refs_bytes),
+        "containers": {name: round(value) for name, value in containers.items()},
+        "finalize": round(finalize_bytes),
+        "types": {name: round(value) for name, value in types_.items()},
+    }
+    report["total"] = (sum(registry.values()) + report["refs"]
+                       + sum(report["containers"].values()) + report["finalize"])
+    return report
+
+def purge(generation: typing.Optional[int] = None, *,
+          max_seconds: typing.Optional[float] = None,
+          max_objects: typing.Optional[int] = None) -> int:
     """Run a purge cycle right now.
 
+    Scan every generation up to and including generation. By default,
+    scan all of them.
+
+    The cycle stops after max_seconds seconds or max_objects referents,
+    if given. The next call resumes where it stopped. Return the number
+    of referents left to scan, 0 when the cycle is complete. A budgeted
+    cycle does not run the garbage collector: objects the cycle leaves
+    in reference cycles are left to the interpreter's collections.
+
     Automatic purging will not be enabled if currently disabled.
     """
-    _purge_func(False)
+    if generation is None:
+        generation = len(_generations) - 1
+    if not 0 <= generation < len(_generations):
+        raise ValueError("invalid generation")
+    return _purge_func(False, generation, max_seconds, max_objects)
 
 
 def purging() -> bool:
@@ -518,98 +1779,180 @@ def purging() -> bool:
     rather strong references."""
     return _purge
 
+def ref_many(objs: _collections_abc.Iterable,
+             callback: _collections_abc.Callable = None) -> list[ReferenceType]:
+    """Return a list of pyweakrefs to each object of objs, in order.
+
+    Faster than calling ref() on each object. Raise TypeError, and
+    create no pyweakref, if any object is not eligible."""
+    return _ref_many(ReferenceType, objs, callback)
+
+def register_counter(cls: type, func: _collections_abc.Callable) -> None:
+    """Register how to count circular references through instances of cls.
+
+    func(obj) returns an iterable of the objects obj refers to directly,
+    or NotImplemented to fall back to the analyzer (see set_analyzer()).
+    It applies to subclasses of cls too, unless they have their own.
+    Builtin handlers cover dict, list, tuple (including namedtuples),
+    dataclasses and classes with __slots__ only."""
+    if not isinstance(cls, type):
+        raise TypeError("cls must be a type")
+    if not callable(func):
+        raise TypeError("func must be callable")
+    _counters[cls] = func
+    _counter_cache.clear()
+
+def set_analyzer(name: str) -> None:
+    """Set the strategy which finds the objects another object
+    refers to when counting circular references.
+
+    "descriptor" (the default) calls the object's get descriptors and
+    iterates over it. "gc" uses gc.get_referents(), which is faster and
+    runs no code of the object, but only sees the objects the garbage
+    collector tracks."""
+    global _analyzer
+    if name not in _analyzers:
+        raise ValueError(f"unknown analyzer {name!r}")
+    _analyzer = name
+
+def set_callback_dispatcher(dispatcher: typing.Any) -> None:
+    """Set how the callbacks of purged pyweakrefs are delivered.
+
+    Callbacks are queued while purging, then delivered in batches:
+    "inline" (the default) by the purging thread once its slice is
+    done, "thread" by a dedicated daemon thread, through an executor
+    such as a concurrent.futures.Executor, or on an asyncio event loop
+    with loop.call_soon_threadsafe(). An exception raised by a
+    callback is reported with sys.excepthook and doesn't stop the
+    others."""
+    global _dispatcher
+    if dispatcher not in ("inline", "thread") and \
+            not callable(getattr(dispatcher, "submit", None)) and \
+            not callable(getattr(dispatcher, "call_soon_threadsafe", None)):
+        raise TypeError("dispatcher must be 'inline', 'thread', an executor or an event loop")
+    _dispatcher = dispatcher
+    if _pending_callbacks:
+        _dispatch_callbacks()
+
+def set_generation_intervals(*intervals: int) -> None:
+    """Set how often each generation is scanned, youngest first.
+
+    Generation n is scanned once every intervals[n] purge cycles.
+    One interval must be given for each generation."""
+    if len(intervals) != len(_generations):
+        raise TypeError(f"expected {len(_generations)} intervals, got {len(intervals)}")
+    if any(not isinstance(interval, int) or interval < 1 for interval in intervals):
+        raise ValueError("intervals must be positive integers")
+    _generation_intervals[:] = intervals
+
+def set_purge_budget(max_seconds: typing.Optional[float] = None,
+                     max_objects: typing.Optional[int] = None) -> None:
+    """Set the budget of each automatic purge slice.
+
+    An automatic purge cycle stops after max_seconds seconds or
+    max_objects referents, and resumes shortly after. None means
+    unlimited. Objects which a budgeted cycle leaves in reference
+    cycles are left to the interpreter's garbage collections."""
+    if max_seconds is not None and max_seconds <= 0:
+        raise ValueError("max_seconds must be positive")
+    if max_objects is not None and max_objects < 1:
+        raise ValueError("max_objects must be positive")
+    _purge_budget[:] = max_seconds, max_objects
+
+def set_purge_interval(minimum: typing.Optional[float] = None,
+                       maximum: typing.Optional[float] = None,
+                       growth_trigger: typing.Optional[int] = None) -> None:
+    """Set the bounds of the interval between two automatic purge cycles.
+
+    A cycle also starts early once growth_trigger new objects have been
+    referenced since the last one. None leaves a setting unchanged. The
+    defaults are 1.0, 60.0 and 10000."""
+    global _interval, _growth_trigger
+    if minimum is None:
+        minimum = _interval_bounds[0]
+    if maximum is None:
+        maximum = _interval_bounds[1]
+    if growth_trigger is None:
+        growth_trigger = _growth_trigger
+    if not 0 < minimum <= maximum:
+        raise ValueError("expected 0 < minimum <= maximum")
+    if growth_trigger < 1:
+        raise ValueError("growth_trigger must be positive")
+    _interval_bounds[:] = minimum, maximum
+    _interval = min(max(_interval, minimum), maximum)
+    _growth_trigger = growth_trigger
+    _wake_purger()
+
+def set_purge_trigger(trigger: str, generation: int = 2) -> None:
+    """Set what starts automatic purge cycles.
+
+    With "timer" (the default), a cycle starts after the purge interval.
+    With "gc", a cycle starts after each collection of the given
+    generation or older which the interpreter runs, and the purger no
+    longer runs extra collections itself."""
+    global _trigger, _gc_trigger_generation
+    if trigger not in ("timer", "gc"):
+        raise ValueError(f"unknown trigger {trigger!r}")
+    if not 0 <= generation <= 2:
+        raise ValueError("invalid generation")
+    _trigger = trigger
+    _gc_trigger_generation = generation
+    if trigger == "gc":
+        if _gc_callback not in gc.callbacks:
+            gc.callbacks.append(_gc_callback)
+    elif _gc_callback in gc.callbacks:
+        gc.callbacks.remove(_gc_callback)
+    _wake_purger()
+
+def stats() -> dict:
+    """Return the statistics of the purge cycles run so far.
+
+    The result maps "cycles" to the number of cycles, "wall_time" and
+    "cpu_time" to the seconds they took, "scanned" and "purged" to the
+    number of objects scanned and purged, "nodes" to the number of
+    objects visited counting circular references, "compacted" to the
+    number of pyweakrefs and proxies freed by compaction, "callbacks" and
+    "callback_time" to the number of callbacks delivered and the seconds
+    they took, and "types" to (scanned, purged) pairs by object type."""
+    with _stats_lock:
+        result = dict(_stats)
+        result["types"] = {name: tuple(counts) for name, counts in _stats["types"].items()}
+    return result
+
+def subscribe(func: _collections_abc.Callable) -> None:
+    """Call func after each purge cycle, with a dict of its statistics.
+
+    The dict has the keys of stats() except "cycles" and "callbacks", and
+    "remaining", the number of objects the cycle has left to scan. Its
+    "callback_time" is the time spent dispatching callbacks, which is the
+    time they took when they are delivered inline."""
+    if not callable(func):
+        raise TypeError("func must be callable")
+    _stats_subscribers.append(func)
+
+def unsubscribe(func: _collections_abc.Callable) -> None:
+    """Stop calling func after each purge cycle."""
+    _stats_subscribers.remove(func)
+
 ref = ReferenceType
 
 ## Final touches ###
 # enable purging
 enable_purging()
 
+# Proxies forward attribute access, so their slots are
+# accessed through their member descriptors.
+_proxied = AbstractProxyType.__dict__["_referent_obj"].__get__
+_set_proxied = AbstractProxyType.__dict__["_referent_obj"].__set__
+_proxy_callback = AbstractProxyType.__dict__["_callback_func"].__get__
+_set_proxy_callback = AbstractProxyType.__dict__["_callback_func"].__set__
+
+# ReferenceDescriptor creates a view of the pyweakrefs of the object,
+# which the purger counts already: don't count the view as a circle.
+_counters[ReferenceView] = lambda view: ()
+
 # Technical names
 AbstractProxyType.__name__ = "AbstractProxy"
 CallableProxyType.__name__ = "CallableProxy"
 ProxyType.__name__ = "Proxy"
 ReferenceType.__name__ = "Reference"
-
-# Touching up ProxyType and CallableProxyType
-_proxy_builder = {
-    "__abs__" : (),
-    "__add__" : ('value',),
-    "__and__" : ('value',),
-    "__bool__": (),
-    "__bytes__": (),
-    "__contains__": ('key',),
-    "__delattr__" : ('name',),
-    "__delitem__" : ('key',),
-    "__divmod__" : ('value',),
-    "__eq__": ('value',),
-    "__float__": (),
-    "__floordiv__": ('value',),
-    "__ge__" : ('value',),
-    "__getitem__": ('value',),
-    "__gt__": ('value',),
-    "__iadd__": ('value',),
-    "__iand__": ('value',),
-    "__ifloordiv__": ('value',),
-    "__ilshift__": ('value',),
-    "__imatmul__": ('value',),
-    "__imod__": ('value',),
-    "__imul__": ('value',),
-    "__index__": (),
-    "__int__": (),
-    "__invert__": (),
-    "__ior__": ('value',),
-    "__ipow__": ('value',),
-    "__irshift__": ('value',),
-    "__isub__": ('value',),
-    "__iter__": (),
-    "__itruediv__": ('value',),
-    "__ixor__": ('value',), 
-    "__le__": ('value',),
-    "__len__": ('value',),
-    "__lshift__": ('value',),
-    "__lt__": ('value',),
-    "__matmul__": ('value',),
-    "__mod__" : ('value',),
-    "__mul__": ('value',),
-    "__ne__": ('value',),
-    "__neg__": (),
-    "__next__": (),
-    "__or__": ('value',),
-    "__pos__": (),
-    "__radd__": ('value',),
-    "__rand__": ('value',),
-    "__rdivmod__": ('value',),
-    "__reversed__": (),
-    "__rfloordiv__": ('value',),
-    "__rlshift__": ('value',),
-    "__rmatmul__": ('value',),
-    "__rmod__": ('value',),
-    "__rmul__": ('value',),
-    "__ror__": ('value',),
-    "__rrshift__": ('value',),
-    "__rshift__": ('value',),
-    "__rsub__": ('value',),
-    "__rtruediv__": ('value',),
-    "__rxor__": ('value',), 
-    "__setattr__": ('name', 'value'),
-    "__setitem__": ('key', 'value'),
-    "__str__": (),
-    "__sub__": ('value',),
-    "__truediv__": ('value',),
-    "__xor__": ('value',),
-}
-
-
-for func_name, params in _proxy_builder.items():
-    code_text = \
-        f"""def funcobj(self, {", ".join(params)}):
-                referent = _proxied(self)
-                return type(referent).{func_name}(referent, {", ".join(params)})"""
-    exec(code_text)
-    funcobj.__module__ = "support"
-    funcobj.__name__ = func_name
-    funcobj.__qualname__ = "AbstractProxyType." + func_name
-    setattr(AbstractProxyType, func_name, funcobj)
-        
-# Clean up
-del  _proxy_builder, funcobj, code_text, func_name, params
\ No newline at end of file
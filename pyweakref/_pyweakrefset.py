@@ -1,5 +1,5 @@
 
-from .support import ref, register
+from .support import _probe, _ref_many, ref, register
 
 # From lib\_weakrefset.py
 
@@ -70,11 +70,20 @@ class WeakSet:
 
     def __contains__(self, item):
         try:
-            wr = ref(item)
+            wr = _probe(item)
         except TypeError:
             return False
         return wr in self.data
 
+    # Not from lib\_weakrefset.py: lookups and set algebra compare
+    # pyweakrefs from _probe(), or the data of another WeakSet, with
+    # self.data, so they don't register pyweakrefs. Loops in Python
+    # iterate a copy, which the purger's removals can't change.
+    def _probes(self, other):
+        if isinstance(other, WeakSet):
+            return other.data
+        return {_probe(item) for item in other}
+
     def __reduce__(self):
         return (self.__class__, (list(self),),
                 getattr(self, '__dict__', None))
@@ -82,7 +91,9 @@ class WeakSet:
     def add(self, item):
         if self._pending_removals:
             self._commit_removals()
-        self.data.add(ref(item, self._remove))
+        # Not from lib\_weakrefset.py: an existing item keeps its pyweakref
+        if _probe(item) not in self.data:
+            self.data.add(ref(item, self._remove))
 
     def clear(self):
         if self._pending_removals:
@@ -107,18 +118,26 @@ class WeakSet:
     def remove(self, item):
         if self._pending_removals:
             self._commit_removals()
-        self.data.remove(ref(item))
+        self.data.remove(_probe(item))
 
     def discard(self, item):
         if self._pending_removals:
             self._commit_removals()
-        self.data.discard(ref(item))
+        self.data.discard(_probe(item))
 
     def update(self, other):
         if self._pending_removals:
             self._commit_removals()
-        for element in other:
-            self.add(element)
+        # Not from lib\_weakrefset.py: create the references in bulk,
+        # only for the new items
+        data = self.data
+        items = []
+        for wr in list(self._probes(other)):
+            if wr not in data:
+                item = wr()
+                if item is not None:
+                    items.append(item)
+        data.update(_ref_many(ref, items, self._remove))
 
     def __ior__(self, other):
         self.update(other)
@@ -138,11 +157,14 @@ class WeakSet:
         if self is other:
             self.data.clear()
         else:
-            self.data.difference_update(ref(item) for item in other)
+            self.data.difference_update(self._probes(other))
         return self
 
     def intersection(self, other):
-        return self.__class__(item for item in other if item in self)
+        # The set intersection iterates the smaller operand.
+        common = self.data & self._probes(other)
+        return self.__class__(item for item in map(ref.__call__, common)
+                              if item is not None)
     __and__ = intersection
 
     def intersection_update(self, other):
@@ -150,27 +172,29 @@ class WeakSet:
     def __iand__(self, other):
         if self._pending_removals:
             self._commit_removals()
-        self.data.intersection_update(ref(item) for item in other)
+        # Keep the pyweakrefs of self, not those of other.
+        probes = self._probes(other)
+        self.data.difference_update([wr for wr in list(self.data) if wr not in probes])
         return self
 
     def issubset(self, other):
-        return self.data.issubset(ref(item) for item in other)
+        return self.data.issubset(self._probes(other))
     __le__ = issubset
 
     def __lt__(self, other):
-        return self.data < set(map(ref, other))
+        return self.data < self._probes(other)
 
     def issuperset(self, other):
-        return self.data.issuperset(ref(item) for item in other)
+        return self.data.issuperset(self._probes(other))
     __ge__ = issuperset
 
     def __gt__(self, other):
-        return self.data > set(map(ref, other))
+        return self.data > self._probes(other)
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.data == set(map(ref, other))
+        return self.data == other.data
 
     def symmetric_difference(self, other):
         newset = self.copy()
@@ -186,15 +210,28 @@ class WeakSet:
         if self is other:
             self.data.clear()
         else:
-            self.data.symmetric_difference_update(ref(item, self._remove) for item in other)
+            data = self.data
+            common = []
+            items = []
+            for wr in list(self._probes(other)):
+                if wr in data:
+                    common.append(wr)
+                else:
+                    item = wr()
+                    if item is not None:
+                        items.append(item)
+            data.difference_update(common)
+            data.update(_ref_many(ref, items, self._remove))
         return self
 
     def union(self, other):
-        return self.__class__(e for s in (self, other) for e in s)
+        newset = self.copy()
+        newset.update(other)
+        return newset
     __or__ = union
 
     def isdisjoint(self, other):
-        return len(self.intersection(other)) == 0
+        return self.data.isdisjoint(self._probes(other))
 
     def __repr__(self):
         return repr(self.data)
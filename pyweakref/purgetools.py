@@ -1,6 +1,19 @@
-from .support import (circular_reference_count, disable_purging, enable_purging, purge, purging)
+from .support import (async_purger, circular_reference_count, compact, disable_purging,
+                      enable_purging, get_analyzer, get_callback_dispatcher,
+                      get_generation_intervals, get_purge_interval, get_purge_trigger,
+                      memory_report, purge, purging, register_counter, set_analyzer,
+                      set_callback_dispatcher, set_generation_intervals,
+                      set_purge_budget, set_purge_interval, set_purge_trigger, stats,
+                      subscribe, unsubscribe)
                       
-__all__ = ["circular_reference_count", "disable_purging", "enable_purging", "purge", "purging"]
+__all__ = ["async_purger", "circular_reference_count", "compact",
+           "disable_purging", "enable_purging", "get_analyzer",
+           "get_callback_dispatcher", "get_generation_intervals",
+           "get_purge_interval", "get_purge_trigger", "memory_report", "purge",
+           "purging", "register_counter", "set_analyzer",
+           "set_callback_dispatcher", "set_generation_intervals",
+           "set_purge_budget", "set_purge_interval", "set_purge_trigger",
+           "stats", "subscribe", "unsubscribe"]
 
 __doc__ = """
 Tools to interact with the purger. 
@@ -1,10 +1,11 @@
 from ._internals import *
 from ._internals import __all__ as _internals_all
+from ._internals import _eligible_types, _probe, _ref_many
 
 import _collections_abc
 import typing
 
-__all__ = _internals_all + ["_remove_dead_pyweakref", "proxy", "register"]
+__all__ = _internals_all + ["_probe", "_ref_many", "_remove_dead_pyweakref", "proxy", "register"]
 __doc__ = "Python weak reference support"
 
 # Bulk of the module
@@ -24,11 +25,15 @@ def proxy(obj: typing.Any, callback: _collections_abc.Callable = None) -> typing
     return ProxyType(obj, callback)
 
 def register(cls: type) -> type:
-    """Decorator to enable pyweakref.ref on a class."""
+    """Decorator to enable pyweakref.ref on a class.
+
+    Classes whose instances CPython can weakly reference (e.g. with
+    __weakref__) don't need it."""
     try:
         if cls is ref:
             raise TypeError
         cls.__pyweakref__ = ReferenceDescriptor()
+        _eligible_types.pop(cls, None)
         return cls
     except Exception as e:
         message = "Cannot enable pyweakref.ref for class {0.__module__}.{0.__qualname__}".format(cls)